@@ -0,0 +1 @@
+# QuickDrop: the server shared by app.py and the Termux version (see core.py).
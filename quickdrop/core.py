@@ -0,0 +1,554 @@
+# ==============================================================================
+# QuickDrop Core
+#
+# The Flask app shared by both entry points: the desktop GUI (app.py) and the
+# Termux version (file_transfer_mark-1_for_android_to_pc/app.py).
+# Each entry point picks a folder, calls create_app() and then run_server().
+# ==============================================================================
+
+# --- Standard Library Imports ---
+import os
+import json
+import mimetypes
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
+from stat import S_ISDIR, S_ISREG
+from urllib.parse import quote
+from threading import Thread
+from zlib import adler32
+
+# --- Third-Party Library Imports ---
+# This section checks if Flask is installed and provides a helpful error message.
+try:
+    from flask import (Blueprint, Flask, Response, current_app, request, render_template,
+                       send_file, send_from_directory, abort)
+    from werkzeug.exceptions import RequestedRangeNotSatisfiable
+except ImportError:
+    print("\n--- ERROR: Flask is not installed ---")
+    print("QuickDrop requires the Flask library to run.")
+    print("Please install it by running this command in your terminal:")
+    print("\tpip install Flask\n")
+    exit()
+
+# orjson is optional; it encodes large directory listings much faster than
+# the standard json module.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# flask_compress is optional; it gzip/brotli-compresses JSON and HTML responses.
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+# waitress and uvicorn are optional servers, tried in that order; without
+# either, QuickDrop falls back to Flask's development server.
+# waitress implements wsgi.file_wrapper, so downloads are handed to its I/O
+# thread as open files instead of being iterated through the WSGI stack.
+try:
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None
+
+try:
+    import uvicorn
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    uvicorn = None
+
+# inotify_simple is optional and Linux-only. When it is available, directory
+# listings are cached and the cache is cleared whenever the shared folder changes.
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+# ==============================================================================
+# Configuration
+# ==============================================================================
+
+# The shared folder, its name and the port live in app.config (see create_app),
+# so the routes below only ever read them through current_app.
+
+# When QuickDrop runs behind a reverse proxy, the proxy can stream downloads
+# straight from disk instead of pushing every byte through Python.
+#   QUICKDROP_BEHIND_PROXY=1      -> X-Sendfile header (Apache, lighttpd)
+#   QUICKDROP_BEHIND_PROXY=nginx  -> X-Accel-Redirect to the internal location
+# See the README for the matching nginx configuration.
+BEHIND_PROXY = os.environ.get('QUICKDROP_BEHIND_PROXY', '').strip().lower()
+ACCEL_REDIRECT_PREFIX = '/internal/'
+
+# Folders with more entries than this are stat()ed by several threads at once.
+PARALLEL_STAT_THRESHOLD = 1000
+STAT_WORKERS = 8
+_stat_pool = ThreadPoolExecutor(max_workers=STAT_WORKERS)
+
+# Size of the server's worker thread pool (waitress). Reading a file releases
+# the GIL, so threads download concurrently without a process pool.
+SERVER_THREADS = int(os.environ.get('QUICKDROP_THREADS') or min(32, (os.cpu_count() or 1) + 4))
+
+# /api/files?stream=1 sends its first line at once, then chunks of up to this
+# many NDJSON lines, or whatever was scanned within STREAM_FLUSH_INTERVAL seconds.
+STREAM_BATCH_SIZE = 256
+STREAM_FLUSH_INTERVAL = 0.1
+
+# Largest page that /api/files returns when ?page= or ?limit= is used.
+MAX_PAGE_SIZE = 1000
+
+# The local IP is looked up at most once a minute.
+LOCAL_IP_TTL = 60
+_ip_cache = {'ip': None, 'ts': 0.0}
+
+bp = Blueprint('quickdrop', __name__)
+compress = Compress() if Compress else None
+
+# ==============================================================================
+# App Factory & Server
+# ==============================================================================
+
+def create_app(shared_dir: str, port: int, device: str = "phone") -> Flask:
+    """
+    Builds the QuickDrop app for one shared folder.
+    `device` names what the other side is in the connection page's wording.
+    """
+    shared_dir = os.path.abspath(shared_dir)
+
+    app = Flask(__name__)
+    app.config['SHARED_DIRECTORY'] = shared_dir
+    app.config['SHARED_PREFIX'] = os.path.join(shared_dir, '')  # trailing separator, for path checks
+    # The same with symlinks resolved: the part of the disk the inotify watcher covers.
+    app.config['WATCHED_PREFIX'] = os.path.join(os.path.realpath(shared_dir), '')
+    app.config['ROOT_FOLDER_NAME'] = os.path.basename(shared_dir)
+    app.config['PORT'] = port
+    app.config['USE_X_SENDFILE'] = BEHIND_PROXY not in ('', '0')
+    # Listings are only served from the cache while the inotify watcher covers the
+    # whole shared folder; otherwise an in-place file change would go unnoticed.
+    app.config['LISTING_CACHE_ENABLED'] = False
+    # Part of the listing cache key; the watcher bumps it on every change.
+    app.config['LISTING_GENERATION'] = 0
+    # Templates are rendered at startup only, so Jinja never needs to re-check them on disk.
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    app.jinja_env.auto_reload = False
+
+    # Compression is applied per view (see compressed()) rather than globally, so
+    # /download never re-compresses files, which are often media anyway.
+    app.config['COMPRESS_REGISTER'] = False
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html']
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    if compress is not None:
+        compress.init_app(app)
+
+    app.register_blueprint(bp)
+
+    # Pages that never change while the server runs are built once, here.
+    with app.app_context():
+        app.config['CONNECTION_PAGE_HTML'] = render_template(
+            'connect.html', ip=get_local_ip(), port=port, device=device).encode('utf-8')
+    with open(os.path.join(app.root_path, 'index.html'), 'rb') as f:
+        app.config['FILES_PAGE_HTML'] = f.read()
+    return app
+
+def run_server(app: Flask):
+    """Serves the app on all interfaces with the best server that is installed."""
+    port = app.config['PORT']
+    if waitress_serve is not None:
+        waitress_serve(app, host='0.0.0.0', port=port, threads=SERVER_THREADS)
+        return
+    if uvicorn is None:
+        # debug=False is important for performance and security in a shared script.
+        app.run(host='0.0.0.0', port=port, debug=False)
+        return
+    # The app object is passed directly (not as an import string) because the
+    # shared folder is chosen at runtime and must stay in this process.
+    uvicorn.run(WsgiToAsgi(app), host='0.0.0.0', port=port, loop='auto', http='auto', log_level='warning')
+
+def watch_shared_directory(app: Flask):
+    """
+    Starts a background thread that clears the directory listing cache
+    whenever anything inside the shared folder changes (Linux only).
+    """
+    if INotify is None:
+        return
+    try:
+        inotify = INotify()
+    except OSError:
+        return
+    # ATTRIB covers changes that only touch a file's mtime (touch, cp -p, rsync -t).
+    mask = (inotify_flags.MODIFY | inotify_flags.ATTRIB | inotify_flags.CREATE | inotify_flags.DELETE
+            | inotify_flags.MOVED_FROM | inotify_flags.MOVED_TO)
+    watched = {}  # watch descriptor -> directory path
+
+    def _watch_tree(top: str) -> bool:
+        # inotify is not recursive, so every sub-folder needs its own watch.
+        for dirpath, _, _ in os.walk(top):
+            try:
+                watched[inotify.add_watch(dirpath, mask)] = dirpath
+            except OSError:
+                return False  # e.g. permission denied or the watch limit was reached
+        return True
+
+    def _run():
+        # Walking a large tree can take a while, so it happens off the main thread.
+        app.config['LISTING_CACHE_ENABLED'] = _watch_tree(app.config['SHARED_DIRECTORY'])
+        while app.config['LISTING_CACHE_ENABLED']:
+            events = inotify.read()
+            # A scan that was already running when the change happened may still
+            # store its result after the clear; bumping the generation first
+            # means that entry is never looked up again.
+            app.config['LISTING_GENERATION'] += 1
+            _list_directory.cache_clear()
+            if any(event.mask & inotify_flags.Q_OVERFLOW for event in events):
+                # The kernel dropped events, possibly the creation of new sub-folders,
+                # so the cache stays off while the whole tree is walked again.
+                app.config['LISTING_CACHE_ENABLED'] = False
+                watched_ok = _watch_tree(app.config['SHARED_DIRECTORY'])
+                app.config['LISTING_GENERATION'] += 1
+                _list_directory.cache_clear()
+                app.config['LISTING_CACHE_ENABLED'] = watched_ok
+                continue
+            for event in events:
+                if event.mask & inotify_flags.ISDIR and event.mask & (inotify_flags.CREATE | inotify_flags.MOVED_TO):
+                    parent = watched.get(event.wd)
+                    if parent and not _watch_tree(os.path.join(parent, event.name)):
+                        app.config['LISTING_CACHE_ENABLED'] = False
+        _list_directory.cache_clear()
+        inotify.close()
+
+    Thread(target=_run, daemon=True).start()
+
+# ==============================================================================
+# Helper Functions
+# ==============================================================================
+
+def get_local_ip() -> str:
+    """
+    Finds the local IP address of the machine to display to the user.
+    Returns the IP address as a string.
+    """
+    now = time.monotonic()
+    if _ip_cache['ip'] and now - _ip_cache['ts'] < LOCAL_IP_TTL:
+        return _ip_cache['ip']
+
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # This is a dummy connection and doesn't have to be reachable.
+        s.connect(('10.255.255.255', 1))
+        ip_address = s.getsockname()[0]
+    except Exception:
+        ip_address = '127.0.0.1'  # Fallback to localhost
+    finally:
+        s.close()
+    _ip_cache['ip'] = ip_address
+    _ip_cache['ts'] = now
+    return ip_address
+
+def resolve_shared_path(subpath: str) -> str:
+    """
+    Maps a URL path to an absolute path inside the shared folder.
+    Aborts with 403 if it points outside of it (e.g. through '..').
+    """
+    local_path = os.path.normpath(os.path.join(current_app.config['SHARED_DIRECTORY'], subpath))
+    if not (local_path + os.sep).startswith(current_app.config['SHARED_PREFIX']):
+        abort(403)
+    return local_path
+
+def _is_watched(directory: str) -> bool:
+    """Tells whether the inotify watcher covers this folder of the share."""
+    return os.path.join(os.path.realpath(directory), '').startswith(current_app.config['WATCHED_PREFIX'])
+
+def compressed(view):
+    """Compresses the view's responses when flask_compress is installed."""
+    return compress.compressed()(view) if compress else view
+
+def dump_json(payload) -> bytes:
+    """Encodes payload as compact JSON bytes, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except orjson.JSONEncodeError:
+            # e.g. a file name that isn't valid UTF-8 (surrogate-escaped by
+            # os.scandir); json.dumps escapes it as \udcXX instead of failing.
+            pass
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def fast_json(payload):
+    """Returns payload as a JSON response."""
+    return Response(dump_json(payload), mimetype='application/json')
+
+# ==============================================================================
+# API Endpoints (for the frontend to fetch data)
+# ==============================================================================
+
+@bp.route('/api/info')
+@compressed
+def get_info():
+    """Provides the root folder name to the frontend."""
+    return fast_json({'root_folder_name': current_app.config['ROOT_FOLDER_NAME']})
+
+@bp.route('/api/files/')
+@bp.route('/api/files/<path:subpath>')
+@compressed
+def list_files(subpath: str = ''):
+    """
+    Lists files and directories for the frontend file browser.
+    Returns a JSON list of items in the requested directory; with ?page= or
+    ?limit=, a JSON object holding 'items' and 'pagination'. With ?stream=1 the
+    items are sent as NDJSON in scan order, and can't be sorted or paginated.
+    """
+    directory = resolve_shared_path(subpath)
+    # One stat() answers "does it exist", "is it a folder" and "when did it change".
+    try:
+        dir_stat = os.stat(directory)
+    except OSError:
+        dir_stat = None
+    if dir_stat is None or not S_ISDIR(dir_stat.st_mode):
+        return abort(404, "Directory not found")
+
+    fields = _requested_fields()
+    if request.args.get('stream') == '1':
+        if any(arg in request.args for arg in ('sort', 'order', 'page', 'limit')):
+            return abort(400, "stream=1 can't be combined with sort, order, page or limit")
+        # NDJSON: entries are sent as they are scanned, so huge folders start
+        # rendering immediately and are never held in memory as a whole.
+        return Response(_stream_directory(directory, subpath, fields), mimetype='application/x-ndjson')
+
+    if fields is not None and not fields & STAT_FIELDS and request.args.get('sort') not in ('size', 'mtime'):
+        # Only names/types were asked for, so the per-entry stat() is skipped.
+        with os.scandir(directory) as entries:
+            items = _entry_records(entries, subpath, with_stat=False)
+    # The folder's mtime is part of the cache key, so adding, removing or
+    # renaming an entry invalidates the cached listing on its own. Folders reached
+    # through a symlink to outside the share aren't watched, so they're never cached.
+    elif current_app.config['LISTING_CACHE_ENABLED'] and _is_watched(directory):
+        items = _list_directory(directory, subpath, dir_stat.st_mtime,
+                                current_app.config['LISTING_GENERATION'])
+    else:
+        items = _list_directory.__wrapped__(directory, subpath, dir_stat.st_mtime)
+    return fast_json(_sort_and_paginate(items, fields))
+
+LISTING_FIELDS = ('name', 'path', 'is_dir', 'size', 'last_modified')
+STAT_FIELDS = {'size', 'last_modified'}
+
+SORT_KEYS = {
+    # The exact name breaks ties between names that differ only in case.
+    'name': lambda item: (item['name'].lower(), item['name']),
+    'size': itemgetter('size'),
+    'mtime': itemgetter('last_modified'),
+}
+
+def _requested_fields():
+    """Returns the set of keys asked for with ?fields=, or None for all of them."""
+    if 'fields' not in request.args:
+        return None
+    fields = set(request.args['fields'].split(','))
+    if not fields <= set(LISTING_FIELDS):
+        return abort(400, "Unknown field")
+    return fields
+
+def _select_fields(items: list, fields) -> list:
+    """Trims every record down to the requested keys."""
+    if fields is None:
+        return items
+    keys = [key for key in LISTING_FIELDS if key in fields]
+    return [{key: item[key] for key in keys} for item in items]
+
+def _sort_and_paginate(items: list, fields=None):
+    """
+    Applies the optional ?sort=name|size|mtime, ?order=asc|desc, ?page= and
+    ?limit= query parameters. Without page or limit the plain list is returned;
+    with them, sort defaults to name.
+    """
+    paginated = 'page' in request.args or 'limit' in request.args
+    # scandir order isn't defined, so pages are always cut from a sorted list.
+    sort = request.args.get('sort', 'name' if paginated else None)
+    if sort is not None:
+        if sort not in SORT_KEYS:
+            return abort(400, "Unknown sort key")
+        # sorted() rather than list.sort(): items may be the cached listing.
+        items = sorted(items, key=SORT_KEYS[sort], reverse=request.args.get('order') == 'desc')
+
+    if not paginated:
+        return _select_fields(items, fields)
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', MAX_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    total = len(items)
+    return {
+        'items': _select_fields(items[(page - 1) * limit:page * limit], fields),
+        'pagination': {
+            'page': page,
+            'limit': limit,
+            'total_items': total,
+            'total_pages': -(-total // limit),
+        },
+    }
+
+def _url_prefix(subpath: str) -> str:
+    # URL paths always use '/', so the prefix is built once per listing instead
+    # of running os.path.join() and a backslash replace for every entry.
+    return subpath.rstrip('/') + '/' if subpath else ''
+
+def _entry_record(entry: os.DirEntry, prefix: str, with_stat: bool = True):
+    """Builds the JSON record for one directory entry, or None if it can't be read."""
+    try:
+        is_dir = entry.is_dir()
+        # A single stat() per entry provides both the size and the mtime.
+        stat = entry.stat() if with_stat else None
+    except OSError:
+        # Skip files that might be temporarily inaccessible (e.g., system files)
+        return None
+    if stat is None and entry.is_symlink() and not os.path.exists(entry.path):
+        # Broken symlinks are skipped like above, where entry.stat() raises for
+        # them; only symlinks pay for this extra stat().
+        return None
+    record = {
+        'name': entry.name,
+        'path': prefix + entry.name,
+        'is_dir': is_dir,
+    }
+    if stat is not None:
+        record['size'] = stat.st_size if not is_dir else 0
+        record['last_modified'] = stat.st_mtime
+    return record
+
+def _entry_records(entries, subpath: str, with_stat: bool = True) -> list:
+    """Builds the JSON records for a batch of directory entries."""
+    prefix = _url_prefix(subpath)
+    records = (_entry_record(entry, prefix, with_stat) for entry in entries)
+    return [record for record in records if record is not None]
+
+def _stream_directory(directory: str, subpath: str, fields=None):
+    """Yields a directory's entries as NDJSON, one JSON object per line."""
+    prefix = _url_prefix(subpath)
+    with_stat = fields is None or bool(fields & STAT_FIELDS)
+    keys = [key for key in LISTING_FIELDS if fields is None or key in fields]
+    # Lines are collected and joined once per batch, so the server writes a few
+    # large chunks instead of one tiny chunk per entry. The first line and slow
+    # scans (e.g. on SD cards) are flushed early so the browser isn't kept waiting.
+    batch = []
+    flushed_at = None
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            record = _entry_record(entry, prefix, with_stat)
+            if record is None:
+                continue
+            if fields is not None:
+                record = {key: record[key] for key in keys}
+            batch.append(dump_json(record))
+            now = time.monotonic()
+            if (flushed_at is None or len(batch) == STREAM_BATCH_SIZE
+                    or now - flushed_at >= STREAM_FLUSH_INTERVAL):
+                yield b'\n'.join(batch) + b'\n'
+                batch = []
+                flushed_at = now
+    if batch:
+        yield b'\n'.join(batch) + b'\n'
+
+@lru_cache(maxsize=512)
+def _list_directory(directory: str, subpath: str, dir_mtime: float, generation: int = 0) -> list:
+    """Scans a shared directory and returns its entries as a list of dicts."""
+    with os.scandir(directory) as it:
+        entries = list(it)
+    if len(entries) <= PARALLEL_STAT_THRESHOLD:
+        return _entry_records(entries, subpath)
+
+    # Large folder: split the stat() calls across the pool. stat() releases
+    # the GIL, so the threads keep several requests in flight to the disk.
+    batch_size = -(-len(entries) // STAT_WORKERS)
+    batches = [entries[i:i + batch_size] for i in range(0, len(entries), batch_size)]
+    items = []
+    for records in _stat_pool.map(_entry_records, batches, repeat(subpath)):
+        items.extend(records)
+    return items
+
+@bp.route('/download/<path:filepath>')
+def download_file(filepath: str):
+    """Serves a single file for download."""
+    abs_path = resolve_shared_path(filepath)
+    dir_path, filename = os.path.split(abs_path)
+
+    if current_app.config['USE_X_SENDFILE']:
+        if not os.path.isfile(abs_path):
+            return abort(404, "File not found")
+        # The reverse proxy serves the file and answers Range / conditional
+        # requests itself, against the file on disk.
+        response = send_from_directory(dir_path, filename, as_attachment=True, conditional=False, etag=True)
+        if BEHIND_PROXY == 'nginx' and 'X-Sendfile' in response.headers:
+            # nginx wants a URI inside its internal location, not a disk path.
+            del response.headers['X-Sendfile']
+            # Built from the normalised path: nginx rejects URIs containing '..'.
+            rel_path = os.path.relpath(abs_path, current_app.config['SHARED_DIRECTORY'])
+            response.headers['X-Accel-Redirect'] = ACCEL_REDIRECT_PREFIX + quote(rel_path.replace(os.sep, '/'))
+        return response
+
+    # The file is opened once and handed over as a raw file object, so the
+    # server's wsgi.file_wrapper can sendfile() it. Size, mtime and ETag come
+    # from fstat() on the same descriptor instead of further stat() calls.
+    # O_NONBLOCK keeps a named pipe from blocking the worker in open(); only
+    # regular files are served, so pipes, devices and sockets get a 404.
+    try:
+        fd = os.open(abs_path, os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0) | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return abort(404, "File not found")
+    st = os.fstat(fd)
+    if not S_ISREG(st.st_mode):
+        os.close(fd)
+        return abort(404, "File not found")
+    fh = os.fdopen(fd, 'rb')
+
+    mime, _ = mimetypes.guess_type(filename)
+    # Same ETag format as Werkzeug builds for paths, so browser caches stay valid.
+    etag = f"{st.st_mtime}-{st.st_size}-{adler32(abs_path.encode()) & 0xFFFFFFFF}"
+    response = send_file(fh, mimetype=mime or 'application/octet-stream', as_attachment=True,
+                         download_name=filename, conditional=False, etag=etag,
+                         last_modified=st.st_mtime)
+    # send_file() can't size a file object, so the length is set here before
+    # answering Range / If-None-Match / If-Modified-Since requests: interrupted
+    # downloads resume and unchanged files come back as 304.
+    response.content_length = st.st_size
+    try:
+        return response.make_conditional(request, accept_ranges=True, complete_length=st.st_size)
+    except RequestedRangeNotSatisfiable:
+        fh.close()
+        raise
+
+# ==============================================================================
+# Web Page Routes (what the user sees)
+# ==============================================================================
+
+@bp.route('/')
+@compressed
+def connection_page():
+    """Serves the main connection page with IP address and QR code."""
+    return Response(current_app.config['CONNECTION_PAGE_HTML'], mimetype='text/html')
+
+@bp.route('/files')
+@compressed
+def files_page():
+    """Serves the main file browser interface (index.html)."""
+    return Response(current_app.config['FILES_PAGE_HTML'], mimetype='text/html')
+
+# index.html only changes between releases, so browsers may reuse it for an
+# hour. The connection page and /api/info embed the IP and folder name, which
+# can change between runs, so those are revalidated (a cheap 304) every time.
+CACHE_CONTROL = {
+    '/files': 'public, max-age=3600',
+    '/': 'no-cache',
+    '/api/info': 'no-cache',
+}
+
+@bp.after_app_request
+def add_cache_headers(response):
+    """Adds Cache-Control and an ETag to the static pages and answers If-None-Match."""
+    cache_control = CACHE_CONTROL.get(request.path)
+    if cache_control is None or response.status_code != 200:
+        return response
+    response.headers['Cache-Control'] = cache_control
+    response.add_etag()
+    return response.make_conditional(request)